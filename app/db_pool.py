@@ -0,0 +1,210 @@
+"""
+SQLite Connection Pool
+Keeps a fixed set of open connections so request handlers reuse them instead of
+reopening the database file on every request.
+"""
+
+import time
+import queue
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Applied once to every new connection: WAL lets readers run alongside the
+# writer, and synchronous=NORMAL is crash-safe under WAL with far fewer fsyncs
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-64000',
+)
+
+class DatabaseError(Exception):
+    pass
+
+def apply_pragmas(conn):
+    """Tune a freshly opened connection"""
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+class SQLitePool:
+    """Thread-safe pool of SQLite connections backed by a queue"""
+
+    def __init__(self, database, size=10, timeout=5):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self._pool = queue.Queue(maxsize=size)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256
+        )
+        apply_pragmas(conn)
+        return conn
+
+    def init(self):
+        """Open all connections up front"""
+        with self._lock:
+            if self._initialized:
+                return
+            for _ in range(self.size):
+                self._pool.put(self._connect())
+            self._initialized = True
+            logger.info(f"Database connection pool initialized: size={self.size}")
+
+    @contextmanager
+    def get_connection(self):
+        """Borrow a connection from the pool and return it when done"""
+        if not self._initialized:
+            self.init()
+
+        try:
+            conn = self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise DatabaseError(f"Timed out after {self.timeout}s waiting for a database connection")
+
+        try:
+            # Make sure the connection is still usable before handing it out;
+            # an empty slot (None) is one whose reconnect failed earlier
+            if conn is not None:
+                try:
+                    conn.execute('SELECT 1')
+                except sqlite3.Error:
+                    logger.warning("Discarding broken database connection from pool")
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    conn = None
+
+            if conn is None:
+                conn = self._connect()
+
+            yield conn
+        finally:
+            # Always give the slot back, empty if no connection could be opened
+            self._pool.put(conn)
+
+    def close(self):
+        """Close every connection currently held by the pool"""
+        with self._lock:
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                if conn is not None:
+                    conn.close()
+            self._initialized = False
+
+class BatchWriter:
+    """Background writer that groups queued inserts into a single transaction"""
+
+    _STOP = object()
+
+    def __init__(self, pool, sql, batch_size=500, flush_interval=0.01):
+        self.pool = pool
+        self.sql = sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='batch-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for insertion; the returned future resolves once it is committed"""
+        if not (self._thread and self._thread.is_alive()):
+            self.start()
+
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def stop(self):
+        """Flush whatever is queued and stop the writer thread"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+
+            # Collect more rows until the batch is full or the flush interval passes
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # Fail this batch but keep the writer alive for the next one
+                logger.error(f"Batch insert of {len(batch)} rows failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        rows = [row for row, _ in batch]
+        try:
+            with self.pool.get_connection() as conn:
+                conn.execute('BEGIN')
+                try:
+                    conn.executemany(self.sql, rows)
+                    conn.execute('COMMIT')
+                except sqlite3.Error:
+                    conn.execute('ROLLBACK')
+                    raise
+        except sqlite3.Error as e:
+            logger.error(f"Batch insert of {len(rows)} rows failed, retrying individually: {str(e)}")
+            self._flush_each(batch)
+            return
+
+        for _, future in batch:
+            future.set_result(True)
+
+    def _flush_each(self, batch):
+        for row, future in batch:
+            try:
+                with self.pool.get_connection() as conn:
+                    conn.execute(self.sql, row)
+                future.set_result(True)
+            except Exception as e:
+                logger.error(f"Insert failed for queued row: {str(e)}")
+                future.set_exception(e)
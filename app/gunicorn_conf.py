@@ -0,0 +1,61 @@
+"""
+Gunicorn Configuration
+Runs the e-commerce app on gevent workers so slow outbound calls yield instead
+of tying up a worker. Start with: gunicorn -c gunicorn_conf.py main:app
+"""
+
+import os
+import logging
+
+def available_cpus():
+    """CPUs this process may run on, which respects container CPU limits"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv('WEB_CONCURRENCY', available_cpus()))
+worker_class = "gevent"
+worker_connections = 1000
+keepalive = 5
+
+# Match the application's log format so server messages land in the same analysis
+logconfig_dict = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'app': {
+            'format': '[%(levelname)s] %(asctime)s - %(message)s',
+            'datefmt': '%Y-%m-%d %H:%M:%S'
+        }
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'app',
+            'stream': 'ext://sys.stdout'
+        }
+    },
+    'root': {'level': 'INFO', 'handlers': ['console']},
+    'loggers': {
+        'gunicorn.error': {'level': 'INFO', 'handlers': ['console'], 'propagate': False},
+        'gunicorn.access': {'level': 'INFO', 'handlers': ['console'], 'propagate': False}
+    }
+}
+
+def on_starting(server):
+    """Run one-time database setup and startup checks once, in the master"""
+    # startup only needs sqlite3, so the master never imports ssl or the app's clients
+    from startup import run_startup_tasks
+    
+    try:
+        run_startup_tasks()
+    except Exception as e:
+        logging.getLogger('startup').critical(f"Failed to start application: {str(e)}")
+        raise
+
+def post_worker_init(worker):
+    """Open the connection pool and background services inside each worker"""
+    from main import start_services
+    
+    start_services()
@@ -4,15 +4,30 @@ This application simulates a real-world e-commerce backend with common failure s
 """
 
 import os
+import sys
+import atexit
 import logging
 import time
+import hashlib
+import threading
 import sqlite3
+import redis
+import gevent
+import orjson
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime
 from flask import Flask, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask.json.provider import JSONProvider
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 import jwt
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from db_pool import SQLitePool, BatchWriter
+from startup import DATABASE_URL, run_startup_tasks
 
 # Configure logging
 logging.basicConfig(
@@ -22,10 +37,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson for request parsing and jsonify"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration from environment variables
-DATABASE_URL = os.getenv('DATABASE_URL', 'ecommerce.db')
 JWT_SECRET = os.getenv('JWT_SECRET', 'your-secret-key')
 PAYMENT_API_URL = os.getenv('PAYMENT_API_URL', 'https://api.payments.internal/v1')
 EMAIL_API_URL = os.getenv('EMAIL_API_URL', 'https://api.notifications.internal/v1')
@@ -34,14 +62,103 @@ API_KEY = os.getenv('API_KEY', 'default_api_key')
 EVENT_BUS_URL = os.getenv('EVENT_BUS_URL', 'https://events.internal/api')
 
 # Failure simulation flags
-SIMULATE_DB_FAILURE = os.getenv('SIMULATE_DB_FAILURE', 'false').lower() == 'true'
 SIMULATE_PAYMENT_TIMEOUT = os.getenv('SIMULATE_PAYMENT_TIMEOUT', 'false').lower() == 'true'
 SIMULATE_AUTH_FAILURE = os.getenv('SIMULATE_AUTH_FAILURE', 'false').lower() == 'true'
 SIMULATE_EMAIL_FAILURE = os.getenv('SIMULATE_EMAIL_FAILURE', 'false').lower() == 'true'
 SIMULATE_MEMORY_LEAK = os.getenv('SIMULATE_MEMORY_LEAK', 'false').lower() == 'true'
 
-class DatabaseError(Exception):
-    pass
+# Run the Flask development server (threaded, for local use) instead of gunicorn
+USE_FLASK_DEV = os.getenv('USE_FLASK_DEV', 'false').lower() == 'true'
+
+# SQL used by the request handlers; keeping the text constant lets each pooled
+# connection reuse its prepared statements
+SQL_INSERT_USER = 'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?) RETURNING id'
+SQL_SELECT_LOGIN_USER = 'SELECT id, password_hash FROM users WHERE username = ?'
+SQL_INSERT_ORDER_WITH_ID = 'INSERT INTO orders (id, user_id, product_name, amount) VALUES (?, ?, ?, ?)'
+SQL_SELECT_ORDER = 'SELECT id, product_name, amount, status FROM orders WHERE id = ? AND user_id = ?'
+SQL_UPDATE_ORDER_STATUS = 'UPDATE orders SET status = ? WHERE id = ?'
+SQL_SELECT_MAX_ORDER_ID = 'SELECT COALESCE(MAX(id), 0) FROM orders'
+
+# Shared database connections for request handlers
+pool = SQLitePool(DATABASE_URL)
+get_connection = pool.get_connection
+
+# Orders are written in batches; ids are reserved up front from a Redis sequence
+order_writer = BatchWriter(pool, SQL_INSERT_ORDER_WITH_ID)
+ORDER_SEQUENCE_KEY = 'orders:seq'
+ORDER_WRITE_TIMEOUT = 5
+
+# Raise the sequence to at least the highest saved id, then take the next one.
+# Runs atomically in Redis, so a lost key or a restarted cache never hands out an
+# id that is already in the table, and concurrent workers never move it backwards.
+RESERVE_ORDER_ID_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local floor = tonumber(ARGV[1])
+if current < floor then
+    redis.call('SET', KEYS[1], floor)
+end
+return redis.call('INCR', KEYS[1])
+"""
+
+# Shared cache client; short timeouts so an unreachable cache never stalls a request
+redis_client = redis.Redis.from_url(
+    CACHE_URL,
+    decode_responses=True,
+    socket_connect_timeout=0.5,
+    socket_timeout=0.5
+)
+
+# Shared HTTP session so outbound calls reuse keep-alive connections.
+# Connection failures are retried; status retries stay limited to idempotent
+# methods so a payment POST is never sent twice.
+http_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+)
+http = requests.Session()
+http.mount('https://', http_adapter)
+http.mount('http://', http_adapter)
+
+# Background workers for slow outbound calls so request threads return quickly
+executor = ThreadPoolExecutor(max_workers=32)
+
+# Argon2id with OWASP minimum parameters
+password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Process-local cache of verified tokens (token -> (user_id, exp)), checked before Redis
+_jwt_cache = {}
+_jwt_cache_lock = threading.Lock()
+_jwt_cache_misses = 0
+JWT_CACHE_PURGE_INTERVAL = 10000
+JWT_CACHE_MAX_ENTRIES = 16384
+
+# Seconds a user's login row stays cached in Redis
+USER_CACHE_TTL = 300
+
+# Sessions live in Redis and expire on their own after this many seconds
+SESSION_TTL = 86400
+
+# Identical notifications within this window are sent only once, and each
+# user may send at most NOTIFICATION_RATE_LIMIT per window
+NOTIFICATION_WINDOW = 60
+NOTIFICATION_RATE_LIMIT = 30
+
+class _Now:
+    """Current local time as an ISO string, refreshed in the background"""
+    s = ""
+    ts = 0
+
+def refresh_now(interval=0.5):
+    """Keep _Now up to date so handlers don't format a timestamp per request"""
+    while True:
+        _Now.s = datetime.now().isoformat()
+        _Now.ts = int(time.time())
+        time.sleep(interval)
+
+def now_iso():
+    """Cached timestamp, falling back to the real clock before the refresher starts"""
+    return _Now.s or datetime.now().isoformat()
 
 class PaymentError(Exception):
     pass
@@ -49,83 +166,159 @@ class PaymentError(Exception):
 class AuthenticationError(Exception):
     pass
 
-def init_database():
-    """Initialize the database with required tables"""
+def cache_call(method, *args, default=None, **kwargs):
+    """Run a Redis command, returning default if the cache is unavailable"""
     try:
-        logger.info("Initializing database...")
-        
-        if SIMULATE_DB_FAILURE:
-            # Simulate database connection failure
-            logger.error("Database connection failed: Could not connect to database server")
-            raise DatabaseError("Connection to database failed")
-        
-        conn = sqlite3.connect(DATABASE_URL)
+        return getattr(redis_client, method)(*args, **kwargs)
+    except redis.RedisError as e:
+        logger.warning(f"Cache unavailable at {CACHE_URL}: {str(e)}")
+        return default
+
+def count_notification(user_id):
+    """Count a send in the user's current rate window, or None if the cache is unavailable"""
+    rate_key = f"rate:{user_id}"
+    try:
+        # Create the counter with its TTL and increment it in one transaction so a
+        # failure in between can never leave a counter that doesn't expire
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.set(rate_key, 0, nx=True, ex=NOTIFICATION_WINDOW)
+        pipe.incr(rate_key)
+        return pipe.execute()[1]
+    except redis.RedisError as e:
+        logger.warning(f"Cache unavailable at {CACHE_URL}: {str(e)}")
+        return None
+
+def token_digest(token):
+    """Stable digest of a JWT so cache keys never contain the raw token"""
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+def token_cache_key(token):
+    """Cache key for a verified JWT"""
+    return "jwt:" + token_digest(token)
+
+def session_cache_key(token):
+    """Cache key for the session created with a JWT"""
+    return "session:" + token_digest(token)
+
+def purge_jwt_cache(now):
+    """Drop expired tokens from the local cache"""
+    with _jwt_cache_lock:
+        for token, (_, exp) in list(_jwt_cache.items()):
+            if exp <= now:
+                _jwt_cache.pop(token, None)
+
+def remember_token(token, user_id, exp, now):
+    """Add a verified token to the local cache, evicting the oldest entries when full"""
+    if len(_jwt_cache) >= JWT_CACHE_MAX_ENTRIES:
+        purge_jwt_cache(now)
+    
+    with _jwt_cache_lock:
+        # Dicts keep insertion order, so the first keys are the oldest entries
+        while len(_jwt_cache) >= JWT_CACHE_MAX_ENTRIES:
+            _jwt_cache.pop(next(iter(_jwt_cache)))
+        _jwt_cache[token] = (user_id, exp)
+
+def authenticate_token(token):
+    """Resolve the user id for a JWT via the local cache, then Redis, then a full decode"""
+    global _jwt_cache_misses
+    now = int(time.time())
+    
+    entry = _jwt_cache.get(token)
+    if entry and entry[1] > now:
+        return entry[0]
+    
+    _jwt_cache_misses += 1
+    if _jwt_cache_misses % JWT_CACHE_PURGE_INTERVAL == 0:
+        purge_jwt_cache(now)
+    
+    cache_key = token_cache_key(token)
+    cached = cache_call('get', cache_key)
+    
+    if cached is not None:
+        try:
+            user_id, exp = (int(value) for value in cached.split(':'))
+        except ValueError:
+            # Entry written in an older format; verify the token from scratch
+            cached = None
+    
+    if cached is None:
+        data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+        user_id, exp = data['user_id'], data['exp']
+        
+        # Expire the cache entry together with the token
+        cache_call('set', cache_key, f"{user_id}:{exp}", ex=max(1, exp - now))
+    
+    remember_token(token, user_id, exp, now)
+    return user_id
+
+def reserve_order_id():
+    """Allocate the next order id, or None if the cache is unavailable"""
+    with get_connection() as conn:
+        max_id = conn.execute(SQL_SELECT_MAX_ORDER_ID).fetchone()[0]
+    
+    return cache_call('eval', RESERVE_ORDER_ID_SCRIPT, 1, ORDER_SEQUENCE_KEY, max_id)
+
+def get_request_token():
+    """Return the bearer token from the Authorization header, if any"""
+    token = request.headers.get('Authorization')
+    
+    # Remove 'Bearer ' prefix if present
+    if token and token.startswith('Bearer '):
+        token = token[7:]
+    
+    return token
+
+def verify_password(password_hash, password):
+    """Check a password against an Argon2 hash, or a legacy Werkzeug hash"""
+    if not password_hash.startswith('$argon2'):
+        return check_password_hash(password_hash, password)
+    
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def get_login_user(username):
+    """Look up (id, password_hash) for a username, caching the row in Redis"""
+    cache_key = f"user:{username}"
+    cached = cache_call('hgetall', cache_key)
+    
+    if cached:
+        return int(cached['id']), cached['hash']
+    
+    with get_connection() as conn:
         cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create sessions table - but simulate missing table error
-        if not SIMULATE_DB_FAILURE:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    token TEXT UNIQUE NOT NULL,
-                    expires_at TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-        
-        # Create orders table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                product_name TEXT NOT NULL,
-                amount DECIMAL(10,2),
-                status TEXT DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        logger.info("Database initialized successfully")
-        
-    except Exception as e:
-        logger.error(f"Database initialization failed: {str(e)}")
-        raise
+        cursor.execute(SQL_SELECT_LOGIN_USER, (username,))
+        user = cursor.fetchone()
+    
+    if user:
+        # Write the row and its TTL in one transaction so a cached password hash
+        # can never be left behind without an expiry
+        try:
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.hset(cache_key, mapping={'id': user[0], 'hash': user[1]})
+            pipe.expire(cache_key, USER_CACHE_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Cache unavailable at {CACHE_URL}: {str(e)}")
+    
+    return user
 
 def verify_token(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
+        token = get_request_token()
         
         if not token:
             logger.warning("Missing authorization token")
             return jsonify({'message': 'Token is missing'}), 401
         
         try:
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
             if SIMULATE_AUTH_FAILURE:
                 logger.error(f"AuthService: Invalid token detected, token={token[:20]}...")
                 raise AuthenticationError("Invalid token")
             
-            data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-            current_user_id = data['user_id']
+            current_user_id = authenticate_token(token)
             
         except jwt.ExpiredSignatureError:
             logger.error("Token has expired")
@@ -147,8 +340,8 @@ def health_check():
         logger.info("Health check requested")
         
         # Check database connection
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.close()
+        with get_connection() as conn:
+            conn.execute('SELECT 1')
         
         # Simulate resource issues
         if SIMULATE_MEMORY_LEAK:
@@ -157,7 +350,7 @@ def health_check():
             logger.warning("Disk usage warning: 91% used on /dev/sda1")
         
         logger.info("Health check passed")
-        return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+        return jsonify({'status': 'healthy', 'timestamp': now_iso()})
         
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -179,28 +372,26 @@ def register():
             return jsonify({'message': 'Missing required fields'}), 400
         
         # Hash password
-        password_hash = generate_password_hash(password)
+        password_hash = password_hasher.hash(password)
         
         # Save to database
-        conn = sqlite3.connect(DATABASE_URL)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(
-                'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
-                (username, email, password_hash)
-            )
-            conn.commit()
-            user_id = cursor.lastrowid
+        with get_connection() as conn:
+            cursor = conn.cursor()
             
-            logger.info(f"User registered successfully: user_id={user_id}")
-            return jsonify({'message': 'User registered successfully', 'user_id': user_id})
-            
-        except sqlite3.IntegrityError:
-            logger.error(f"Registration failed: Username or email already exists")
-            return jsonify({'message': 'Username or email already exists'}), 409
-        finally:
-            conn.close()
+            try:
+                cursor.execute(SQL_INSERT_USER, (username, email, password_hash))
+                user_id = cursor.fetchone()[0]
+                
+            except sqlite3.IntegrityError:
+                logger.error(f"Registration failed: Username or email already exists")
+                return jsonify({'message': 'Username or email already exists'}), 409
+        
+        # Drop any stale login row cached for this username, after the
+        # connection is back in the pool
+        cache_call('delete', f"user:{username}")
+        
+        logger.info(f"User registered successfully: user_id={user_id}")
+        return jsonify({'message': 'User registered successfully', 'user_id': user_id})
             
     except Exception as e:
         logger.error(f"Registration error: {str(e)}")
@@ -219,14 +410,10 @@ def login():
         if not all([username, password]):
             return jsonify({'message': 'Missing credentials'}), 400
         
-        # Get user from database
-        conn = sqlite3.connect(DATABASE_URL)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
-        user = cursor.fetchone()
+        # Get user from cache or database
+        user = get_login_user(username)
         
-        if not user or not check_password_hash(user[1], password):
+        if not user or not verify_password(user[1], password):
             logger.warning(f"Login failed: Invalid credentials for user {username}")
             return jsonify({'message': 'Invalid credentials'}), 401
         
@@ -235,23 +422,11 @@ def login():
         # Create JWT token
         token = jwt.encode({
             'user_id': user_id,
-            'exp': datetime.utcnow() + timedelta(hours=24)
+            'exp': int(time.time()) + SESSION_TTL
         }, JWT_SECRET, algorithm='HS256')
         
-        # Try to save session (this might fail if sessions table doesn't exist)
-        try:
-            cursor.execute(
-                'INSERT INTO sessions (user_id, token, expires_at) VALUES (?, ?, ?)',
-                (user_id, token, datetime.utcnow() + timedelta(hours=24))
-            )
-            conn.commit()
-        except sqlite3.OperationalError as e:
-            logger.error(f"Database query failed: ERROR: relation \"sessions\" does not exist")
-            logger.error(f"    at sqlite3.connect.execute(session_insert)")
-            logger.error(f"    at app.login(main.py:180)")
-            # Continue without saving session
-        
-        conn.close()
+        # Save session; Redis expires it together with the token
+        cache_call('setex', session_cache_key(token), SESSION_TTL, user_id)
         
         logger.info(f"User logged in successfully: user_id={user_id}")
         return jsonify({'token': token, 'user_id': user_id})
@@ -275,48 +450,82 @@ def create_order(current_user_id):
             return jsonify({'message': 'Missing order details'}), 400
         
         # Save order to database
-        conn = sqlite3.connect(DATABASE_URL)
-        cursor = conn.cursor()
+        order_id = reserve_order_id()
         
-        cursor.execute(
-            'INSERT INTO orders (user_id, product_name, amount) VALUES (?, ?, ?)',
-            (current_user_id, product_name, amount)
-        )
-        order_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        if order_id is None:
+            # Inserting without a reserved id could collide with ids still queued for writing
+            logger.error("Order creation unavailable: could not reserve an order id")
+            return jsonify({'message': 'Order service temporarily unavailable'}), 503
         
-        # Process payment
-        try:
-            payment_result = process_payment(order_id, amount)
-            
-            if payment_result['status'] == 'success':
-                logger.info(f"Order completed successfully: order_id={order_id}")
-                return jsonify({
-                    'message': 'Order created successfully',
-                    'order_id': order_id,
-                    'payment_status': 'completed'
-                })
-            else:
-                logger.error(f"Payment failed for order {order_id}: {payment_result['error']}")
-                return jsonify({
-                    'message': 'Order created but payment failed',
-                    'order_id': order_id,
-                    'payment_status': 'failed'
-                }), 402
-                
-        except PaymentError as e:
-            logger.error(f"Payment processing failed: {str(e)}")
-            return jsonify({
-                'message': 'Order created but payment failed',
-                'order_id': order_id,
-                'payment_status': 'failed'
-            }), 402
+        order_written = order_writer.submit((order_id, current_user_id, product_name, amount))
+        
+        # Process payment in the background; clients poll GET /order/<id> for the result
+        executor.submit(settle_payment, order_id, amount, order_written)
+        
+        logger.info(f"Order accepted, payment pending: order_id={order_id}")
+        return jsonify({
+            'message': 'Order created, payment processing',
+            'order_id': order_id,
+            'payment_status': 'pending'
+        }), 202
             
     except Exception as e:
         logger.error(f"Order creation failed: {str(e)}")
         return jsonify({'message': 'Order creation failed'}), 500
 
+@app.route('/order/<int:order_id>', methods=['GET'])
+@verify_token
+def get_order(current_user_id, order_id):
+    """Return an order and its payment status"""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_ORDER, (order_id, current_user_id))
+            order = cursor.fetchone()
+        
+        if not order:
+            return jsonify({'message': 'Order not found'}), 404
+        
+        return jsonify({
+            'order_id': order[0],
+            'product_name': order[1],
+            'amount': order[2],
+            'payment_status': order[3]
+        })
+        
+    except Exception as e:
+        logger.error(f"Order lookup failed: {str(e)}")
+        return jsonify({'message': 'Order lookup failed'}), 500
+
+def settle_payment(order_id, amount, order_written):
+    """Run payment for an order off the request thread and record the outcome"""
+    # Never charge for an order that did not make it to the database
+    try:
+        order_written.result(timeout=ORDER_WRITE_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Order {order_id} was not saved, skipping payment: {str(e)}")
+        return
+    
+    try:
+        payment_result = process_payment(order_id, amount)
+        
+        if payment_result['status'] == 'success':
+            logger.info(f"Order completed successfully: order_id={order_id}")
+            status = 'completed'
+        else:
+            logger.error(f"Payment failed for order {order_id}: {payment_result['error']}")
+            status = 'failed'
+            
+    except PaymentError as e:
+        logger.error(f"Payment processing failed: {str(e)}")
+        status = 'failed'
+    
+    try:
+        with get_connection() as conn:
+            conn.execute(SQL_UPDATE_ORDER_STATUS, (status, order_id))
+    except Exception as e:
+        logger.error(f"Failed to update payment status for order {order_id}: {str(e)}")
+
 def process_payment(order_id, amount):
     """Process payment through external payment service"""
     try:
@@ -325,7 +534,7 @@ def process_payment(order_id, amount):
         # Simulate payment service timeout
         if SIMULATE_PAYMENT_TIMEOUT:
             logger.info(f"Calling payment service: POST {PAYMENT_API_URL}/process")
-            time.sleep(6)  # Simulate long response time
+            gevent.sleep(6)  # Simulate long response time; yields to other requests on the gevent worker
             logger.error(f"Timeout while calling payment-service: POST {PAYMENT_API_URL}/process - took 6000ms")
             raise PaymentError("Payment service timeout")
         
@@ -338,7 +547,7 @@ def process_payment(order_id, amount):
             }
             
             # This will fail due to invalid URL
-            response = requests.post(
+            response = http.post(
                 f"{PAYMENT_API_URL}/process",
                 json=payment_data,
                 timeout=5
@@ -351,19 +560,15 @@ def process_payment(order_id, amount):
                 return {'status': 'failed', 'error': 'Transaction declined'}
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Payment service connection failed: {str(e)}")
-            
-            # Simulate retry logic
-            logger.info(f"Retrying payment request for order_id={order_id}")
-            logger.info("Retry attempt 1/3")
-            
-            # Second attempt also fails
-            logger.error("Payment gateway returned 500: \"Transaction declined by provider\"")
-            
-            # Simulate NullPointerException in payment processing
-            logger.error("java.lang.NullPointerException")
-            logger.error("    at com.ecommerce.payment.PaymentProcessor.process(PaymentProcessor.java:142)")
-            logger.error("    at com.ecommerce.billing.BillingService.chargeUser(BillingService.java:85)")
+            # Retries are handled by the session's adapter before we get here.
+            # The whole failure, including the simulated NullPointerException,
+            # goes out as one log record.
+            logger.error("\n".join([
+                f"Payment service connection failed: {str(e)}",
+                "java.lang.NullPointerException",
+                "    at com.ecommerce.payment.PaymentProcessor.process(PaymentProcessor.java:142)",
+                "    at com.ecommerce.billing.BillingService.chargeUser(BillingService.java:85)"
+            ]))
             
             raise PaymentError("Payment processing failed after retries")
             
@@ -378,24 +583,15 @@ def logout(current_user_id):
     try:
         logger.info(f"Logout request received: user_id={current_user_id}")
         
-        # Try to send logout event to event bus
-        try:
-            event_data = {
-                'event_type': 'user_logout',
-                'user_id': current_user_id,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # This will fail due to wrong configuration
-            response = requests.post(
-                f'{EVENT_BUS_URL}/events',
-                json=event_data,
-                timeout=2
-            )
-            
-        except requests.exceptions.ConnectionError:
-            logger.error("Failed to send logout event to event-bus: ConnectionRefusedError [Errno 111]")
-            # Continue with logout even if event bus fails
+        cache_call('delete', session_cache_key(get_request_token()))
+        
+        # Send logout event to event bus without blocking the response
+        event_data = {
+            'event_type': 'user_logout',
+            'user_id': current_user_id,
+            'timestamp': now_iso()
+        }
+        executor.submit(publish_event, event_data)
         
         logger.info(f"User logged out successfully: user_id={current_user_id}")
         return jsonify({'message': 'Logged out successfully'})
@@ -404,6 +600,21 @@ def logout(current_user_id):
         logger.error(f"Logout error: {str(e)}")
         return jsonify({'message': 'Logout failed'}), 500
 
+def publish_event(event_data):
+    """Deliver an event to the event bus"""
+    try:
+        # This will fail due to wrong configuration
+        http.post(
+            f'{EVENT_BUS_URL}/events',
+            json=event_data,
+            timeout=2
+        )
+        
+    except requests.exceptions.ConnectionError:
+        logger.error("Failed to send logout event to event-bus: ConnectionRefusedError [Errno 111]")
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to send event to event-bus: {str(e)}")
+
 @app.route('/send-notification', methods=['POST'])
 @verify_token
 def send_notification(current_user_id):
@@ -413,9 +624,24 @@ def send_notification(current_user_id):
         email = data.get('email')
         message = data.get('message')
         
+        # Suppress repeats of the same notification, e.g. from client retries
+        content_hash = hashlib.blake2b(f"{current_user_id}:{email}:{message}".encode(), digest_size=16).hexdigest()
+        dedupe_key = f"notif:{content_hash}"
+        if not cache_call('set', dedupe_key, 1, nx=True, ex=NOTIFICATION_WINDOW, default=True):
+            logger.info(f"Duplicate notification suppressed for {email}")
+            return jsonify({'message': 'Duplicate notification suppressed'})
+        
+        sent_count = count_notification(current_user_id)
+        if sent_count and sent_count > NOTIFICATION_RATE_LIMIT:
+            cache_call('delete', dedupe_key)
+            logger.warning(f"Notification rate limit exceeded: user_id={current_user_id}")
+            return jsonify({'message': 'Too many notifications, try again later'}), 429
+        
         logger.info(f"Sending notification to {email}")
         
         if SIMULATE_EMAIL_FAILURE:
+            # Allow the client to retry a send that never went out
+            cache_call('delete', dedupe_key)
             logger.error("SMTP server not responding: [Errno 110] Connection timed out")
             logger.error(f"Failed to send notification email to {email}")
             return jsonify({'message': 'Failed to send notification'}), 500
@@ -438,51 +664,38 @@ def not_found(error):
     logger.warning(f"Endpoint not found: {request.path}")
     return jsonify({'message': 'Endpoint not found'}), 404
 
-def cleanup_sessions():
-    """Clean up expired sessions"""
-    try:
-        logger.info("Session cleanup job started")
-        
-        conn = sqlite3.connect(DATABASE_URL)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM sessions WHERE expires_at < ?', (datetime.utcnow(),))
-        deleted_count = cursor.rowcount
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Session cleanup completed: removed {deleted_count} expired sessions")
-        
-    except Exception as e:
-        logger.error(f"Session cleanup failed: {str(e)}")
+def start_services():
+    """Start the per-process connection pool, order writer and clock"""
+    # Start the cached clock used for response timestamps
+    threading.Thread(target=refresh_now, name='clock', daemon=True).start()
+    
+    # Open pooled database connections
+    pool.init()
+    atexit.register(pool.close)
+    
+    # Start batched order writes; registered last so it flushes before the pool closes
+    order_writer.start()
+    atexit.register(order_writer.stop)
 
 if __name__ == '__main__':
-    try:
-        logger.info("Starting e-commerce backend server on port 8000")
-        
-        # Initialize database
-        init_database()
-        
-        # Perform cleanup
-        cleanup_sessions()
-        
-        # Check if we should simulate critical failure
-        if os.getenv('SIMULATE_CRITICAL_FAILURE', 'false').lower() == 'true':
-            logger.info("Shutting down gracefully...")
-            logger.critical("Unhandled exception in main thread")
-            logger.critical("Traceback (most recent call last):")
-            logger.critical('  File "main.py", line 400, in <module>')
-            logger.critical("    app.run()")
-            logger.critical('  File "main.py", line 398, in run_app')
-            logger.critical("    initialize_services()")
-            logger.critical('  File "services/initializer.py", line 33, in initialize_services')
-            logger.critical('    raise RuntimeError("Unable to initialize critical service: payment-service")')
-            logger.critical('RuntimeError: Unable to initialize critical service: payment-service')
-            raise RuntimeError("Unable to initialize critical service: payment-service")
-        
-        app.run(host='0.0.0.0', port=8000, debug=False)
-        
-    except Exception as e:
-        logger.critical(f"Failed to start application: {str(e)}")
-        raise
+    logger.info("Starting e-commerce backend server on port 8000")
+    
+    if USE_FLASK_DEV:
+        try:
+            run_startup_tasks()
+            start_services()
+            app.run(host='0.0.0.0', port=8000, debug=False)
+            
+        except Exception as e:
+            logger.critical(f"Failed to start application: {str(e)}")
+            raise
+    else:
+        # Hand the process over to gunicorn, whose master runs run_startup_tasks()
+        # and whose workers each call start_services()
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        os.execv(sys.executable, [
+            sys.executable, '-m', 'gunicorn',
+            '--chdir', app_dir,
+            '--config', os.path.join(app_dir, 'gunicorn_conf.py'),
+            'main:app'
+        ])
@@ -0,0 +1,90 @@
+"""
+Application Startup Tasks
+One-time database setup and startup checks. Kept free of the HTTP, cache and
+JWT dependencies so the gunicorn master can run it without importing them.
+"""
+
+import os
+import logging
+import sqlite3
+from db_pool import DatabaseError, apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv('DATABASE_URL', 'ecommerce.db')
+SIMULATE_DB_FAILURE = os.getenv('SIMULATE_DB_FAILURE', 'false').lower() == 'true'
+
+def init_database():
+    """Initialize the database with required tables"""
+    try:
+        logger.info("Initializing database...")
+        
+        if SIMULATE_DB_FAILURE:
+            # Simulate database connection failure
+            logger.error("Database connection failed: Could not connect to database server")
+            raise DatabaseError("Connection to database failed")
+        
+        conn = sqlite3.connect(DATABASE_URL)
+        apply_pragmas(conn)
+        cursor = conn.cursor()
+        
+        # Create users table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create orders table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                product_name TEXT NOT NULL,
+                amount DECIMAL(10,2),
+                status TEXT DEFAULT 'pending',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        conn.commit()
+        conn.close()
+        logger.info("Database initialized successfully")
+        
+    except Exception as e:
+        logger.error(f"Database initialization failed: {str(e)}")
+        raise
+
+def cleanup_sessions():
+    """Clean up expired sessions"""
+    # Sessions are stored in Redis with a TTL, so there is nothing to delete
+    logger.info("Session cleanup skipped: sessions expire automatically in cache")
+
+def run_startup_tasks():
+    """One-time setup before serving; under gunicorn this runs once in the master"""
+    # Initialize database
+    init_database()
+    
+    # Perform cleanup
+    cleanup_sessions()
+    
+    # Check if we should simulate critical failure
+    if os.getenv('SIMULATE_CRITICAL_FAILURE', 'false').lower() == 'true':
+        logger.info("Shutting down gracefully...")
+        logger.critical("\n".join([
+            "Unhandled exception in main thread",
+            "Traceback (most recent call last):",
+            '  File "main.py", line 400, in <module>',
+            "    app.run()",
+            '  File "main.py", line 398, in run_app',
+            "    initialize_services()",
+            '  File "services/initializer.py", line 33, in initialize_services',
+            '    raise RuntimeError("Unable to initialize critical service: payment-service")',
+            'RuntimeError: Unable to initialize critical service: payment-service'
+        ]))
+        raise RuntimeError("Unable to initialize critical service: payment-service")
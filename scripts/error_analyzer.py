@@ -4,10 +4,19 @@ This script uses Embedchain to analyze error logs and provide intelligent insigh
 """
 
 import os
+import re
 import sys
+import hashlib
+from pathlib import Path
 from datetime import datetime
 from embedchain import App
 
+# RE2 matches in linear time; fall back to the standard library if it is missing
+try:
+    import re2 as line_regex
+except ImportError:
+    line_regex = re
+
 # Check for OpenAI API key
 openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
@@ -19,49 +28,24 @@ if not openai_api_key:
 # Set the API key for embedchain
 os.environ["OPENAI_API_KEY"] = openai_api_key
 
-def analyze_error_logs(log_file_path="logs/application.log"):
-    """
-    Analyze error logs using AI and generate a comprehensive summary
-    """
-    try:
-        # Initialize Embedchain app
-        app = App()
-        
-        # Debug: Check current working directory and list files
-        current_dir = os.getcwd()
-        print(f"Current working directory: {current_dir}")
-        print(f"Looking for log file at: {os.path.abspath(log_file_path)}")
-        
-        # List contents of logs directory if it exists
-        logs_dir = os.path.dirname(log_file_path) or "."
-        if os.path.exists(logs_dir):
-            print(f"Contents of {logs_dir}:")
-            for item in os.listdir(logs_dir):
-                item_path = os.path.join(logs_dir, item)
-                if os.path.isfile(item_path):
-                    size = os.path.getsize(item_path)
-                    print(f"   {item} ({size} bytes)")
-                else:
-                    print(f"   {item}/")
-        else:
-            print(f"Directory {logs_dir} does not exist")
-        
-        # Read the log file
-        if not os.path.exists(log_file_path):
-            print(f"Error: Log file {log_file_path} not found")
-            return False
-            
-        with open(log_file_path, "r") as f:
-            logs = f.read()
-        
-        if not logs.strip():
-            print("Error: Log file is empty")
-            return False
-        
-        print(f"Analyzing {len(logs)} characters of log data...")
-        
-        # Enhanced prompt for better analysis
-        prompt = f"""You are an expert DevOps engineer and log analyst. Analyze the following application error log and provide a comprehensive summary.
+# Log lines worth sending to the model, e.g. "[ERROR] 2024-08-02 12:34:56 - message",
+# plus Java and Python stack traces, matched together in a single pass
+ERROR_LINE_PATTERN = line_regex.compile(r'^\[(CRITICAL|ERROR|WARNING)\]|java\.lang\.|Traceback')
+LOG_LINE_PATTERN = re.compile(r'^\[\w+\] [\d-]+ [\d:]+ - ')
+
+# Process ids and object addresses change on every run
+# (e.g. "Booting worker with pid: 1234", "<function f at 0x7f3a2c1e>")
+PID_PATTERN = re.compile(r'(\bpid:?\s*)\d+|\(\d+\)')
+ADDRESS_PATTERN = re.compile(r'0x[0-9a-fA-F]+')
+
+# Unprefixed lines that belong to the entry above them: indented stack frames,
+# exception lines and the separators Python prints between chained tracebacks
+CONTINUATION_PATTERN = re.compile(
+    r'^(\s|Traceback|[\w.]+(Error|Exception)(:|$)|During handling of|The above exception)'
+)
+
+# Enhanced prompt for better analysis
+PROMPT_TEMPLATE = """You are an expert DevOps engineer and log analyst. Analyze the following application error log and provide a comprehensive summary.
 
 Please structure your analysis as follows:
 
@@ -100,14 +84,134 @@ Identify the underlying causes of the issues and their relationships.
 
 ---
 
-Application Log Data:
+Application Log Data (ERROR, WARNING and CRITICAL entries and stack traces only; repeated messages are shown once with a count such as "(x3)"):
 {logs}
 
 Please provide detailed, actionable insights that would help a development team quickly understand and resolve these issues."""
 
-        # Query the AI model
-        print("Generating AI analysis...")
-        result = app.query(prompt)
+# Previous analyses keyed by a hash of the prompt and the normalized log entries
+ANALYSIS_CACHE_DIR = Path(".analysis_cache")
+
+_app = None
+
+def get_app():
+    """Create the Embedchain app once per process"""
+    global _app
+    if _app is None:
+        _app = App()
+    return _app
+
+def normalize_pid(match):
+    return f"{match.group(1)}N" if match.group(1) else "(N)"
+
+def extract_error_lines(log_file_path):
+    """
+    Stream the log file and keep only error-level and stack trace entries, collapsing
+    repeats of the same message into one entry with a count. Stack trace lines that
+    follow a kept entry are treated as part of that entry. Also returns a
+    fingerprint of the entries that ignores timestamps, pids and object addresses.
+    """
+    counts = {}
+    first_seen = {}
+    total_lines = 0
+    
+    def add_entry(entry):
+        text = "\n".join(entry)
+        # Ignore timestamps, pids and addresses so repeated messages collapse together
+        signature = LOG_LINE_PATTERN.sub("", text, count=1)
+        signature = PID_PATTERN.sub(normalize_pid, signature)
+        signature = ADDRESS_PATTERN.sub("0xN", signature)
+        if signature not in counts:
+            counts[signature] = 0
+            first_seen[signature] = entry
+        counts[signature] += 1
+    
+    entry = None
+    with open(log_file_path, "r") as f:
+        for line in f:
+            total_lines += 1
+            line = line.rstrip("\n")
+            
+            if entry is not None and CONTINUATION_PATTERN.match(line):
+                entry.append(line)
+                continue
+            
+            if entry is not None:
+                add_entry(entry)
+                entry = None
+            
+            if ERROR_LINE_PATTERN.search(line):
+                entry = [line]
+    
+    if entry is not None:
+        add_entry(entry)
+    
+    entries = []
+    for signature, entry in first_seen.items():
+        count = counts[signature]
+        first_line = f"{entry[0]} (x{count})" if count > 1 else entry[0]
+        entries.append("\n".join([first_line] + entry[1:]))
+    
+    fingerprint = "\n".join(f"{counts[signature]}\t{signature}" for signature in first_seen)
+    return "\n".join(entries), total_lines, fingerprint
+
+def analyze_error_logs(log_file_path="logs/application.log"):
+    """
+    Analyze error logs using AI and generate a comprehensive summary
+    """
+    try:
+        # Debug: Check current working directory and list files
+        current_dir = os.getcwd()
+        print(f"Current working directory: {current_dir}")
+        print(f"Looking for log file at: {os.path.abspath(log_file_path)}")
+        
+        # List contents of logs directory if it exists
+        logs_dir = os.path.dirname(log_file_path) or "."
+        if os.path.exists(logs_dir):
+            print(f"Contents of {logs_dir}:")
+            for item in os.listdir(logs_dir):
+                item_path = os.path.join(logs_dir, item)
+                if os.path.isfile(item_path):
+                    size = os.path.getsize(item_path)
+                    print(f"   {item} ({size} bytes)")
+                else:
+                    print(f"   {item}/")
+        else:
+            print(f"Directory {logs_dir} does not exist")
+        
+        # Read the log file
+        if not os.path.exists(log_file_path):
+            print(f"Error: Log file {log_file_path} not found")
+            return False
+            
+        if os.path.getsize(log_file_path) == 0:
+            print("Error: Log file is empty")
+            return False
+        
+        logs, total_lines, fingerprint = extract_error_lines(log_file_path)
+        
+        if not logs:
+            print(f"No ERROR, WARNING or CRITICAL entries found in {total_lines} log lines")
+            return True
+        
+        print(f"Analyzing {len(logs)} characters of error data (filtered from {total_lines} log lines)...")
+        
+        prompt = PROMPT_TEMPLATE.format(logs=logs)
+
+        # Reuse the previous analysis if the same errors were seen with the same prompt
+        digest = hashlib.blake2b(f"{PROMPT_TEMPLATE}\0{fingerprint}".encode(), digest_size=16).hexdigest()
+        cache_path = ANALYSIS_CACHE_DIR / f"{digest}.md"
+        
+        if cache_path.exists():
+            print(f"Using cached analysis: {cache_path}")
+            result = cache_path.read_text()
+        else:
+            # Query the AI model
+            print("Generating AI analysis...")
+            result = get_app().query(prompt)
+            
+            ANALYSIS_CACHE_DIR.mkdir(exist_ok=True)
+            cache_path.write_text(result)
         
         # Save the analysis
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
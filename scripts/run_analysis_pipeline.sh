@@ -10,7 +10,7 @@ source venv/bin/activate
 
 echo "Installing dependencies..."
 pip install --upgrade pip
-pip install embedchain openai requests beautifulsoup4 langdetect python-docx
+pip install embedchain openai requests beautifulsoup4 langdetect python-docx google-re2
 
 echo "Creating logs directory..."
 mkdir -p logs
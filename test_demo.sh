@@ -75,7 +75,7 @@ fi
 if [ "$SKIP_AI" = false ]; then
     echo ""
     echo "Running AI analysis..."
-    pip install -q embedchain openai requests beautifulsoup4 langdetect python-docx
+    pip install -q embedchain openai requests beautifulsoup4 langdetect python-docx google-re2
     
     python scripts/error_analyzer.py
     